@@ -2,165 +2,227 @@
 Tests for the Mergington High School Activities API
 """
 
+import asyncio
+
+import httpx
+import orjson
 import pytest
 from fastapi.testclient import TestClient
 from src.app import app, activities
 
 
-@pytest.fixture
+# Request URLs used across the tests
+_ROOT_URL = "/"
+_ACTIVITIES_URL = "/activities"
+_SIGNUP_BASKETBALL_NEW = "/activities/Basketball/signup?email=newemail@mergington.edu"
+_SIGNUP_BASKETBALL_EXISTING = "/activities/Basketball/signup?email=james@mergington.edu"
+_SIGNUP_NONEXISTENT = "/activities/Nonexistent/signup?email=student@mergington.edu"
+_SIGNUP_TENNIS_STUDENT1 = "/activities/Tennis/signup?email=student1@mergington.edu"
+_SIGNUP_TENNIS_STUDENT2 = "/activities/Tennis/signup?email=student2@mergington.edu"
+_UNREGISTER_BASKETBALL_EXISTING = "/activities/Basketball/unregister?email=james@mergington.edu"
+_UNREGISTER_BASKETBALL_UNKNOWN = "/activities/Basketball/unregister?email=notregistered@mergington.edu"
+_UNREGISTER_NONEXISTENT = "/activities/Nonexistent/unregister?email=student@mergington.edu"
+_UNREGISTER_DRAMA_GRACE = "/activities/Drama Club/unregister?email=grace@mergington.edu"
+_UNREGISTER_DRAMA_LUKE = "/activities/Drama Club/unregister?email=luke@mergington.edu"
+
+# Absolute URLs for the async client, parsed once instead of on every request
+_ASYNC_BASE_URL = httpx.URL("http://test")
+_ASYNC_ACTIVITIES_URL = _ASYNC_BASE_URL.join(_ACTIVITIES_URL)
+_ASYNC_SIGNUP_TENNIS_STUDENT1 = _ASYNC_BASE_URL.join(_SIGNUP_TENNIS_STUDENT1)
+_ASYNC_SIGNUP_TENNIS_STUDENT2 = _ASYNC_BASE_URL.join(_SIGNUP_TENNIS_STUDENT2)
+_ASYNC_UNREGISTER_DRAMA_GRACE = _ASYNC_BASE_URL.join(_UNREGISTER_DRAMA_GRACE)
+_ASYNC_UNREGISTER_DRAMA_LUKE = _ASYNC_BASE_URL.join(_UNREGISTER_DRAMA_LUKE)
+
+# Initial activity data, built once at import time
+_ORIGINAL_ACTIVITIES = {
+    "Basketball": {
+        "description": "Learn basketball skills and compete in games",
+        "schedule": "Mondays and Wednesdays, 4:00 PM - 5:30 PM",
+        "max_participants": 15,
+        "participants": ["james@mergington.edu"]
+    },
+    "Tennis": {
+        "description": "Tennis training and match play",
+        "schedule": "Tuesdays and Thursdays, 4:00 PM - 5:30 PM",
+        "max_participants": 12,
+        "participants": ["alex@mergington.edu"]
+    },
+    "Drama Club": {
+        "description": "Theater performances and acting workshops",
+        "schedule": "Wednesdays, 3:30 PM - 5:00 PM",
+        "max_participants": 25,
+        "participants": ["grace@mergington.edu", "luke@mergington.edu"]
+    },
+    "Art Studio": {
+        "description": "Painting, drawing, and sculpture techniques",
+        "schedule": "Fridays, 3:30 PM - 5:00 PM",
+        "max_participants": 18,
+        "participants": ["natalie@mergington.edu"]
+    },
+    "Debate Team": {
+        "description": "Competitive debate and public speaking",
+        "schedule": "Mondays and Thursdays, 3:30 PM - 4:30 PM",
+        "max_participants": 16,
+        "participants": ["marcus@mergington.edu", "jessica@mergington.edu"]
+    },
+    "Math Olympiad": {
+        "description": "Advanced math problem solving and competitions",
+        "schedule": "Tuesdays, 4:00 PM - 5:00 PM",
+        "max_participants": 20,
+        "participants": ["ryan@mergington.edu"]
+    },
+    "Chess Club": {
+        "description": "Learn strategies and compete in chess tournaments",
+        "schedule": "Fridays, 3:30 PM - 5:00 PM",
+        "max_participants": 12,
+        "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
+    },
+    "Programming Class": {
+        "description": "Learn programming fundamentals and build software projects",
+        "schedule": "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
+        "max_participants": 20,
+        "participants": ["emma@mergington.edu", "sophia@mergington.edu"]
+    },
+    "Gym Class": {
+        "description": "Physical education and sports activities",
+        "schedule": "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
+        "max_participants": 30,
+        "participants": ["john@mergington.edu", "olivia@mergington.edu"]
+    }
+}
+
+
+# Activities whose participants a request may have changed since the last reset
+_touched_activities = set()
+
+
+def _activity_name_from_path(path):
+    """Return the activity name from an /activities/{activity_name}/{action} path
+
+    Every mutating route must have this shape for the rollback to see it;
+    TestActivitiesRollback checks the app's routes against it.
+    """
+    parts = path.split("/")
+    if len(parts) == 4 and parts[1] == "activities":
+        return parts[2]
+    return None
+
+
+class _RecordingApp:
+    """ASGI wrapper that records which activities signup/unregister requests hit"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] != "GET":
+            name = _activity_name_from_path(scope["path"])
+            if name is not None:
+                _touched_activities.add(name)
+        await self.app(scope, receive, send)
+
+
+_recording_app = _RecordingApp(app)
+
+
+def _decode(response):
+    """Decode a JSON response body with orjson"""
+    return orjson.loads(response.content)
+
+
+async def _send_all(aclient, method, urls):
+    """Send independent requests concurrently and return their responses"""
+    return await asyncio.gather(*(aclient.request(method, url) for url in urls))
+
+
+def _rollback_touched_activities():
+    """Restore the participants of every activity touched since the last reset"""
+    for name in _touched_activities:
+        if name in _ORIGINAL_ACTIVITIES:
+            activities[name]["participants"] = _ORIGINAL_ACTIVITIES[name]["participants"].copy()
+    _touched_activities.clear()
+
+
+@pytest.fixture(scope="session")
 def client():
-    """Create a test client for the FastAPI app"""
-    return TestClient(app)
+    """Create a test client for the FastAPI app, shared across the session"""
+    with TestClient(_recording_app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    """Run async tests on asyncio only"""
+    return "asyncio"
+
+
+@pytest.fixture
+async def aclient():
+    """Create an async client that talks to the app over its ASGI interface"""
+    transport = httpx.ASGITransport(app=_recording_app)
+    async with httpx.AsyncClient(transport=transport, base_url=_ASYNC_BASE_URL) as async_client:
+        yield async_client
+
+
+@pytest.fixture(scope="module")
+def pristine_activities(client):
+    """Fetch and decode GET /activities once for the read-only tests
+
+    Every test's changes are rolled back after it runs, so the activities
+    are in their initial state whenever this runs, whatever the test order.
+    """
+    response = client.get(_ACTIVITIES_URL)
+    assert response.status_code == 200
+    return _decode(response)
 
 
 @pytest.fixture(autouse=True)
 def reset_activities():
-    """Reset activities to initial state before each test"""
-    # Store original state
-    original_activities = {
-        "Basketball": {
-            "description": "Learn basketball skills and compete in games",
-            "schedule": "Mondays and Wednesdays, 4:00 PM - 5:30 PM",
-            "max_participants": 15,
-            "participants": ["james@mergington.edu"]
-        },
-        "Tennis": {
-            "description": "Tennis training and match play",
-            "schedule": "Tuesdays and Thursdays, 4:00 PM - 5:30 PM",
-            "max_participants": 12,
-            "participants": ["alex@mergington.edu"]
-        },
-        "Drama Club": {
-            "description": "Theater performances and acting workshops",
-            "schedule": "Wednesdays, 3:30 PM - 5:00 PM",
-            "max_participants": 25,
-            "participants": ["grace@mergington.edu", "luke@mergington.edu"]
-        },
-        "Art Studio": {
-            "description": "Painting, drawing, and sculpture techniques",
-            "schedule": "Fridays, 3:30 PM - 5:00 PM",
-            "max_participants": 18,
-            "participants": ["natalie@mergington.edu"]
-        },
-        "Debate Team": {
-            "description": "Competitive debate and public speaking",
-            "schedule": "Mondays and Thursdays, 3:30 PM - 4:30 PM",
-            "max_participants": 16,
-            "participants": ["marcus@mergington.edu", "jessica@mergington.edu"]
-        },
-        "Math Olympiad": {
-            "description": "Advanced math problem solving and competitions",
-            "schedule": "Tuesdays, 4:00 PM - 5:00 PM",
-            "max_participants": 20,
-            "participants": ["ryan@mergington.edu"]
-        },
-        "Chess Club": {
-            "description": "Learn strategies and compete in chess tournaments",
-            "schedule": "Fridays, 3:30 PM - 5:00 PM",
-            "max_participants": 12,
-            "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
-        },
-        "Programming Class": {
-            "description": "Learn programming fundamentals and build software projects",
-            "schedule": "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
-            "max_participants": 20,
-            "participants": ["emma@mergington.edu", "sophia@mergington.edu"]
-        },
-        "Gym Class": {
-            "description": "Physical education and sports activities",
-            "schedule": "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
-            "max_participants": 30,
-            "participants": ["john@mergington.edu", "olivia@mergington.edu"]
-        }
-    }
-    
-    # Clear and reset
-    activities.clear()
-    activities.update(original_activities)
+    """Restore whatever activities the test changed; a no-op for read-only tests"""
     yield
-    # Reset after test
-    activities.clear()
-    activities.update(original_activities)
+    _rollback_touched_activities()
 
 
 class TestGetActivities:
     """Test the GET /activities endpoint"""
 
-    def test_get_activities_returns_all_activities(self, client):
+    def test_get_activities_returns_all_activities(self, pristine_activities):
         """Test that all activities are returned"""
-        response = client.get("/activities")
-        assert response.status_code == 200
-        data = response.json()
+        data = pristine_activities
         assert "Basketball" in data
         assert "Tennis" in data
         assert "Drama Club" in data
         assert len(data) == 9
 
-    def test_activity_has_required_fields(self, client):
-        """Test that each activity has required fields"""
-        response = client.get("/activities")
-        data = response.json()
-        activity = data["Basketball"]
-        
-        assert "description" in activity
-        assert "schedule" in activity
-        assert "max_participants" in activity
-        assert "participants" in activity
-
-    def test_participants_list_contains_initial_members(self, client):
-        """Test that participant lists contain initial members"""
-        response = client.get("/activities")
-        data = response.json()
-        
-        assert "james@mergington.edu" in data["Basketball"]["participants"]
-        assert "alex@mergington.edu" in data["Tennis"]["participants"]
+    @pytest.mark.parametrize(
+        "name,details", _ORIGINAL_ACTIVITIES.items(), ids=list(_ORIGINAL_ACTIVITIES)
+    )
+    def test_activity_matches_initial_data(self, pristine_activities, name, details):
+        """Test that each activity has all its initial fields and members"""
+        assert pristine_activities[name] == details
 
 
 class TestSignupForActivity:
     """Test the POST /activities/{activity_name}/signup endpoint"""
 
-    def test_signup_new_participant(self, client):
-        """Test signing up a new participant"""
-        response = client.post(
-            "/activities/Basketball/signup?email=newemail@mergington.edu"
-        )
-        assert response.status_code == 200
-        data = response.json()
-        assert "Signed up" in data["message"]
-        assert "newemail@mergington.edu" in data["message"]
-
     def test_signup_adds_participant_to_activity(self, client):
         """Test that signup actually adds the participant"""
-        client.post("/activities/Basketball/signup?email=newemail@mergington.edu")
-        response = client.get("/activities")
-        data = response.json()
+        assert client.post(_SIGNUP_BASKETBALL_NEW).status_code == 200
+        response = client.get(_ACTIVITIES_URL)
+        data = _decode(response)
         assert "newemail@mergington.edu" in data["Basketball"]["participants"]
 
-    def test_signup_duplicate_participant_fails(self, client):
-        """Test that signing up the same person twice fails"""
-        response = client.post(
-            "/activities/Basketball/signup?email=james@mergington.edu"
-        )
-        assert response.status_code == 400
-        data = response.json()
-        assert "already signed up" in data["detail"]
-
-    def test_signup_nonexistent_activity_fails(self, client):
-        """Test that signing up for a nonexistent activity fails"""
-        response = client.post(
-            "/activities/Nonexistent/signup?email=student@mergington.edu"
-        )
-        assert response.status_code == 404
-        data = response.json()
-        assert "not found" in data["detail"]
-
-    def test_signup_multiple_different_participants(self, client):
+    @pytest.mark.anyio
+    async def test_signup_multiple_different_participants(self, aclient):
         """Test signing up multiple different participants"""
-        client.post("/activities/Tennis/signup?email=student1@mergington.edu")
-        client.post("/activities/Tennis/signup?email=student2@mergington.edu")
-        
-        response = client.get("/activities")
-        data = response.json()
+        responses = await _send_all(aclient, "POST", [
+            _ASYNC_SIGNUP_TENNIS_STUDENT1,
+            _ASYNC_SIGNUP_TENNIS_STUDENT2,
+        ])
+        assert all(r.status_code == 200 for r in responses)
+
+        response = await aclient.get(_ASYNC_ACTIVITIES_URL)
+        data = _decode(response)
         assert "student1@mergington.edu" in data["Tennis"]["participants"]
         assert "student2@mergington.edu" in data["Tennis"]["participants"]
 
@@ -168,55 +230,76 @@ class TestSignupForActivity:
 class TestUnregisterFromActivity:
     """Test the DELETE /activities/{activity_name}/unregister endpoint"""
 
-    def test_unregister_existing_participant(self, client):
-        """Test unregistering an existing participant"""
-        response = client.delete(
-            "/activities/Basketball/unregister?email=james@mergington.edu"
-        )
-        assert response.status_code == 200
-        data = response.json()
-        assert "Unregistered" in data["message"]
-
     def test_unregister_removes_participant(self, client):
         """Test that unregister actually removes the participant"""
-        client.delete("/activities/Basketball/unregister?email=james@mergington.edu")
-        response = client.get("/activities")
-        data = response.json()
+        assert client.delete(_UNREGISTER_BASKETBALL_EXISTING).status_code == 200
+        response = client.get(_ACTIVITIES_URL)
+        data = _decode(response)
         assert "james@mergington.edu" not in data["Basketball"]["participants"]
 
-    def test_unregister_nonexistent_participant_fails(self, client):
-        """Test that unregistering a non-participant fails"""
-        response = client.delete(
-            "/activities/Basketball/unregister?email=notregistered@mergington.edu"
-        )
-        assert response.status_code == 400
-        data = response.json()
-        assert "not signed up" in data["detail"]
-
-    def test_unregister_nonexistent_activity_fails(self, client):
-        """Test that unregistering from a nonexistent activity fails"""
-        response = client.delete(
-            "/activities/Nonexistent/unregister?email=student@mergington.edu"
-        )
-        assert response.status_code == 404
-        data = response.json()
-        assert "not found" in data["detail"]
-
-    def test_unregister_multiple_participants(self, client):
+    @pytest.mark.anyio
+    async def test_unregister_multiple_participants(self, aclient):
         """Test unregistering multiple participants from the same activity"""
-        client.delete("/activities/Drama Club/unregister?email=grace@mergington.edu")
-        client.delete("/activities/Drama Club/unregister?email=luke@mergington.edu")
-        
-        response = client.get("/activities")
-        data = response.json()
+        responses = await _send_all(aclient, "DELETE", [
+            _ASYNC_UNREGISTER_DRAMA_GRACE,
+            _ASYNC_UNREGISTER_DRAMA_LUKE,
+        ])
+        assert all(r.status_code == 200 for r in responses)
+
+        response = await aclient.get(_ASYNC_ACTIVITIES_URL)
+        data = _decode(response)
         assert len(data["Drama Club"]["participants"]) == 0
 
 
+class TestSignupAndUnregisterResponses:
+    """Test the status and message of signup and unregister responses"""
+
+    @pytest.mark.parametrize("method,url,status,needle", [
+        pytest.param("POST", _SIGNUP_BASKETBALL_NEW, 200, b"Signed up newemail@mergington.edu",
+                     id="signup_new_participant"),
+        pytest.param("POST", _SIGNUP_BASKETBALL_EXISTING, 400, b"already signed up",
+                     id="signup_duplicate_participant_fails"),
+        pytest.param("POST", _SIGNUP_NONEXISTENT, 404, b"not found",
+                     id="signup_nonexistent_activity_fails"),
+        pytest.param("DELETE", _UNREGISTER_BASKETBALL_EXISTING, 200, b"Unregistered",
+                     id="unregister_existing_participant"),
+        pytest.param("DELETE", _UNREGISTER_BASKETBALL_UNKNOWN, 400, b"not signed up",
+                     id="unregister_nonexistent_participant_fails"),
+        pytest.param("DELETE", _UNREGISTER_NONEXISTENT, 404, b"not found",
+                     id="unregister_nonexistent_activity_fails"),
+    ])
+    def test_response(self, client, method, url, status, needle):
+        """Test that the endpoint responds with the expected status and message"""
+        response = client.request(method, url)
+        assert response.status_code == status and needle in response.content, response.text
+
+
+class TestActivitiesRollback:
+    """Test the rollback that restores activities after mutating tests"""
+
+    def test_rollback_restores_touched_activities(self, client):
+        """Test that rollback undoes both signups and unregistrations"""
+        assert client.post(_SIGNUP_TENNIS_STUDENT1).status_code == 200
+        assert client.delete(_UNREGISTER_DRAMA_GRACE).status_code == 200
+
+        _rollback_touched_activities()
+
+        response = client.get(_ACTIVITIES_URL)
+        assert _decode(response) == _ORIGINAL_ACTIVITIES
+
+    def test_every_mutating_route_is_recorded(self):
+        """Test that the recorder can read the activity name of every mutating route"""
+        for route in app.routes:
+            methods = getattr(route, "methods", None) or set()
+            if methods - {"GET", "HEAD"}:
+                assert _activity_name_from_path(route.path) == "{activity_name}", route.path
+
+
 class TestRootEndpoint:
     """Test the root / endpoint"""
 
     def test_root_redirects_to_static_html(self, client):
         """Test that root endpoint redirects to static/index.html"""
-        response = client.get("/", follow_redirects=False)
+        response = client.get(_ROOT_URL, follow_redirects=False)
         assert response.status_code == 307
         assert "/static/index.html" in response.headers["location"]